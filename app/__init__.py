@@ -1,20 +1,50 @@
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 import os
 
+from .security import PasswordHasher, LoginThrottle
+
 db = SQLAlchemy()
 login_manager = LoginManager()
+password_hasher = PasswordHasher()
+login_throttle = LoginThrottle()
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
 
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'devfallbackkey')
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///gymtracker.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Password hashing cost and worker pool
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+    app.config['PASSWORD_SALT_LENGTH'] = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5.0))
+
+    # Failed login throttling
+    app.config['LOGIN_MAX_ATTEMPTS_ACCOUNT'] = int(os.environ.get('LOGIN_MAX_ATTEMPTS_ACCOUNT', 5))
+    app.config['LOGIN_MAX_ATTEMPTS_IP'] = int(os.environ.get('LOGIN_MAX_ATTEMPTS_IP', 20))
+    app.config['LOGIN_THROTTLE_WINDOW'] = int(os.environ.get('LOGIN_THROTTLE_WINDOW', 900))
+    app.config['LOGIN_THROTTLE_ENTRIES'] = int(os.environ.get('LOGIN_THROTTLE_ENTRIES', 10000))
+
+    # Number of reverse proxies in front of the app. Needed for the per-IP
+    # login limit, otherwise every client shares the proxy's address.
+    app.config['PROXY_FIX_X_FOR'] = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+    if test_config:
+        app.config.update(test_config)
+
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
     db.init_app(app)
     login_manager.init_app(app)
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
     login_manager.login_view = 'login'
 
     from app.routes import main
@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import event
+
+# Distinct parameter sets after which a repeated statement counts as N+1
+N_PLUS_ONE_THRESHOLD = 3
+
+
+def query_budget(max_queries):
+    """
+    Declares the most SQL statements a view may run for one request.
+    Checked by the test suite, no effect at runtime.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def get_query_budget(endpoint, app=None):
+    app = app or current_app
+    return getattr(app.view_functions[endpoint], "query_budget", None)
+
+
+class QueryCounter:
+    """
+    Records every statement sent to the engine while active.
+
+        with QueryCounter(db.engine) as counter:
+            client.get("/workouts")
+        counter.count
+    """
+
+    def __init__(self, engine, n_plus_one_threshold=N_PLUS_ONE_THRESHOLD):
+        self.engine = engine
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self):
+        """
+        Statements run at least ``n_plus_one_threshold`` times with different
+        parameters -- usually a lazy load inside a loop (N+1).
+        """
+        params_by_sql = defaultdict(set)
+        for statement, parameters in self.statements:
+            params_by_sql[statement].add(repr(parameters))
+        return {
+            statement: len(params)
+            for statement, params in params_by_sql.items()
+            if len(params) >= self.n_plus_one_threshold
+        }
+
+    def report(self):
+        return "\n".join(f"  {sql} {params!r}" for sql, params in self.statements)
+
+    def check(self, budget, label="request"):
+        """Raise AssertionError if over ``budget`` or if an N+1 pattern shows up."""
+        suspects = self.repeated()
+        if suspects:
+            lines = "\n".join(f"  x{n}: {sql}" for sql, n in suspects.items())
+            raise AssertionError(f"Likely N+1 queries in {label}:\n{lines}")
+        if budget is not None and self.count > budget:
+            raise AssertionError(
+                f"{label} ran {self.count} queries, budget is {budget}:\n{self.report()}"
+            )
@@ -1,13 +1,14 @@
 from datetime import date, timedelta, datetime
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy import func
 
-from . import db
+from . import db, password_hasher, login_throttle
+from .security import HasherBusy
 from .ai_coach import get_ai_advice
 from .forms import RegisterForm, LoginForm, WorkoutForm, MealForm, ProgressForm, GoalForm
 from .models import User, Workout, Meal, Progress, Goal
+from .query_budget import query_budget
 
 # -------------------------
 # Blueprint
@@ -18,18 +19,22 @@ main = Blueprint("main", __name__)
 # Home / Auth
 # -------------------------
 @main.route("/")
+@query_budget(1)
 def home():
     if current_user.is_authenticated:
         return redirect(url_for("main.dashboard"))
     return redirect(url_for("main.login"))
 
 @main.route("/register", methods=["GET", "POST"])
+@query_budget(1)
 def register():
     form = RegisterForm()
     if form.validate_on_submit():
-        hashed_password = generate_password_hash(
-            form.password.data, method="pbkdf2:sha256", salt_length=16
-        )
+        try:
+            hashed_password = password_hasher.hash(form.password.data)
+        except HasherBusy:
+            flash("Server is busy, please try again in a moment.", "danger")
+            return render_template("register.html", form=form), 503
         new_user = User(
             name=form.name.data, email=form.email.data, password=hashed_password
         )
@@ -40,17 +45,44 @@ def register():
     return render_template("register.html", form=form)
 
 @main.route("/login", methods=["GET", "POST"])
+@query_budget(3)
 def login():
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
-        if user and check_password_hash(user.password, form.password.data):
+        email = form.email.data
+        ip = request.remote_addr
+        # Counted as a failure up front; given back on success or 503
+        if not login_throttle.reserve(email, ip):
+            flash("Too many failed attempts. Please try again later.", "danger")
+            return render_template("login.html", form=form), 429
+
+        user = User.query.filter_by(email=email).first()
+        try:
+            valid = password_hasher.verify(
+                user.password if user else None, form.password.data
+            )
+        except HasherBusy:
+            login_throttle.release(email, ip)
+            flash("Server is busy, please try again in a moment.", "danger")
+            return render_template("login.html", form=form), 503
+
+        if valid:
+            login_throttle.release(email, ip)
+            login_throttle.reset(email)
+            # Upgrade old hashes to the configured cost; retried next login if busy
+            if password_hasher.needs_rehash(user.password):
+                try:
+                    user.password = password_hasher.hash(form.password.data)
+                    db.session.commit()
+                except HasherBusy:
+                    pass
             login_user(user)
             return redirect(url_for("main.dashboard"))
         flash("Invalid email or password.", "danger")
     return render_template("login.html", form=form)
 
 @main.route("/logout")
+@query_budget(1)
 @login_required
 def logout():
     logout_user()
@@ -60,6 +92,7 @@ def logout():
 # Dashboard
 # -------------------------
 @main.route("/dashboard")
+@query_budget(12)
 @login_required
 def dashboard():
     today = date.today()
@@ -173,6 +206,7 @@ def dashboard():
 # Workouts CRUD
 # -------------------------
 @main.route("/workouts")
+@query_budget(2)
 @login_required
 def workouts():
     user_workouts = (
@@ -183,6 +217,7 @@ def workouts():
     return render_template("workouts.html", workouts=user_workouts)
 
 @main.route("/workouts/add", methods=["GET", "POST"])
+@query_budget(2)
 @login_required
 def add_workout():
     form = WorkoutForm()
@@ -205,6 +240,7 @@ def add_workout():
     return render_template("workout_form.html", form=form, action="Add")
 
 @main.route("/workouts/edit/<int:id>", methods=["GET", "POST"])
+@query_budget(3)
 @login_required
 def edit_workout(id):
     workout = Workout.query.get_or_404(id)
@@ -226,6 +262,7 @@ def edit_workout(id):
     return render_template("workout_form.html", form=form, action="Edit")
 
 @main.route("/workouts/delete/<int:id>")
+@query_budget(3)
 @login_required
 def delete_workout(id):
     workout = Workout.query.get_or_404(id)
@@ -242,6 +279,7 @@ def delete_workout(id):
 # Meals CRUD
 # -------------------------
 @main.route("/meals")
+@query_budget(2)
 @login_required
 def meals():
     user_meals = (
@@ -252,6 +290,7 @@ def meals():
     return render_template("meals.html", meals=user_meals)
 
 @main.route("/meals/add", methods=["GET", "POST"])
+@query_budget(2)
 @login_required
 def add_meal():
     form = MealForm()
@@ -272,6 +311,7 @@ def add_meal():
     return render_template("meal_form.html", form=form, action="Add")
 
 @main.route("/meals/edit/<int:id>", methods=["GET", "POST"])
+@query_budget(3)
 @login_required
 def edit_meal(id):
     meal = Meal.query.get_or_404(id)
@@ -294,6 +334,7 @@ def edit_meal(id):
     return render_template("meal_form.html", form=form, action="Edit")
 
 @main.route("/meals/delete/<int:id>")
+@query_budget(3)
 @login_required
 def delete_meal(id):
     meal = Meal.query.get_or_404(id)
@@ -310,6 +351,7 @@ def delete_meal(id):
 # Progress CRUD
 # -------------------------
 @main.route("/progress")
+@query_budget(2)
 @login_required
 def progress_list():
     user_progress = (
@@ -320,6 +362,7 @@ def progress_list():
     return render_template("progress.html", progress=user_progress)
 
 @main.route("/progress/add", methods=["GET", "POST"])
+@query_budget(2)
 @login_required
 def add_progress():
     form = ProgressForm()
@@ -337,6 +380,7 @@ def add_progress():
     return render_template("progress_form.html", form=form, action="Add")
 
 @main.route("/progress/edit/<int:id>", methods=["GET", "POST"])
+@query_budget(3)
 @login_required
 def edit_progress(id):
     prog = Progress.query.get_or_404(id)
@@ -356,6 +400,7 @@ def edit_progress(id):
     return render_template("progress_form.html", form=form, action="Edit")
 
 @main.route("/progress/delete/<int:id>")
+@query_budget(3)
 @login_required
 def delete_progress(id):
     prog = Progress.query.get_or_404(id)
@@ -372,6 +417,7 @@ def delete_progress(id):
 # Goals CRUD
 # -------------------------
 @main.route("/goals", methods=["GET", "POST"])
+@query_budget(2)
 @login_required
 def goals():
     form = GoalForm()
@@ -391,6 +437,7 @@ def goals():
     return render_template("goals.html", form=form, goals=goals)
 
 @main.route("/goals/add", methods=["GET", "POST"])
+@query_budget(2)
 @login_required
 def add_goal():
     form = GoalForm()
@@ -408,6 +455,7 @@ def add_goal():
     return render_template("goals_form.html", action="Add", form=form)
 
 @main.route("/goals/edit/<int:id>", methods=["GET", "POST"])
+@query_budget(3)
 @login_required
 def edit_goal(id):
     goal = Goal.query.get_or_404(id)
@@ -422,6 +470,7 @@ def edit_goal(id):
     return render_template("goals_form.html", action="Edit", form=form, goal=goal)
 
 @main.route("/goals/delete/<int:id>")
+@query_budget(3)
 @login_required
 def delete_goal(id):
     goal = Goal.query.get_or_404(id)
@@ -430,6 +479,7 @@ def delete_goal(id):
     return redirect(url_for("main.goals"))
 
 @main.route("/goals/<int:goal_id>/complete", methods=["POST"])
+@query_budget(3)
 @login_required
 def complete_goal(goal_id):
     goal = Goal.query.get_or_404(goal_id)
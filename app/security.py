@@ -0,0 +1,208 @@
+import concurrent.futures
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool is full or too slow and the request should back off."""
+
+
+def _parse_method(method):
+    """Splits a stored method like ``pbkdf2:sha256:600000`` into (scheme, cost params)."""
+    parts = method.split(":")
+    if parts[0] == "pbkdf2":
+        digest = parts[1] if len(parts) > 1 else None
+        return f"pbkdf2:{digest}", tuple(int(p) for p in parts[2:])
+    return parts[0], tuple(int(p) for p in parts[1:])
+
+
+# -------------------------
+# Password hashing
+# -------------------------
+class _HasherState:
+    def __init__(self, config):
+        self.method = config["PASSWORD_HASH_METHOD"]
+        self.salt_length = config["PASSWORD_SALT_LENGTH"]
+        self.timeout = config["PASSWORD_HASH_TIMEOUT"]
+
+        workers = config["PASSWORD_HASH_WORKERS"]
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="pwhash"
+        )
+        # Running + queued jobs are capped; anything beyond that is rejected
+        self.slots = threading.BoundedSemaphore(
+            workers + config["PASSWORD_HASH_QUEUE"]
+        )
+
+        # Reference hash with the configured parameters. Its prefix is the
+        # fully spelled out target method (Werkzeug fills in default costs),
+        # and it is checked against when an email is unknown so that case
+        # costs the same as a wrong password.
+        self.dummy_hash = self.generate("dummy-password")
+        self.target = _parse_method(self.dummy_hash.split("$", 1)[0])
+
+    def generate(self, password):
+        return generate_password_hash(
+            password, method=self.method, salt_length=self.salt_length
+        )
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a small bounded thread pool so CPU-heavy
+    pbkdf2 work can't take over every worker during login bursts.
+    When the pool is full, callers get ``HasherBusy`` straight away
+    instead of waiting for a slot.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        state = _HasherState(app.config)
+        app.extensions["password_hasher"] = state
+        weakref.finalize(app, state.executor.shutdown, wait=False)
+
+    @property
+    def _state(self):
+        return current_app.extensions["password_hasher"]
+
+    def _run(self, fn, *args):
+        state = self._state
+        if not state.slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = state.executor.submit(fn, *args)
+        except Exception:
+            state.slots.release()
+            raise
+        # The slot is held until the job really finishes, even if we stop waiting
+        future.add_done_callback(lambda _: state.slots.release())
+        try:
+            return future.result(timeout=state.timeout)
+        except concurrent.futures.TimeoutError:
+            raise HasherBusy()
+
+    def hash(self, password):
+        return self._run(self._state.generate, password)
+
+    def verify(self, pwhash, password):
+        if pwhash is None:
+            self._run(check_password_hash, self._state.dummy_hash, password)
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """
+        True if the stored hash is weaker than the configured settings:
+        a different scheme, a lower cost or a shorter salt. Stronger
+        hashes are left alone.
+        """
+        state = self._state
+        try:
+            method, salt, _ = pwhash.split("$", 2)
+            scheme, cost = _parse_method(method)
+        except ValueError:
+            return True
+        target_scheme, target_cost = state.target
+        if scheme != target_scheme or len(cost) != len(target_cost):
+            return True
+        if any(have < want for have, want in zip(cost, target_cost)):
+            return True
+        return len(salt) < state.salt_length
+
+
+# -------------------------
+# Failed login throttling
+# -------------------------
+class _ThrottleState:
+    def __init__(self, config):
+        self.window = config["LOGIN_THROTTLE_WINDOW"]
+        self.max_entries = config["LOGIN_THROTTLE_ENTRIES"]
+        self.limits = {
+            "account": config["LOGIN_MAX_ATTEMPTS_ACCOUNT"],
+            "ip": config["LOGIN_MAX_ATTEMPTS_IP"],
+        }
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def count(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            return 0
+        count, started = entry
+        if now - started >= self.window:
+            del self.entries[key]
+            return 0
+        return count
+
+
+class LoginThrottle:
+    """
+    Counts login attempts per key (account or IP) in a fixed window.
+    An attempt is reserved before the password is hashed, so concurrent
+    guesses can't all slip past the limit; successful or rejected
+    attempts are given back afterwards.
+    Keeps at most ``LOGIN_THROTTLE_ENTRIES`` keys, dropping the one
+    whose last attempt is oldest. Counters are per process.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["login_throttle"] = _ThrottleState(app.config)
+
+    @property
+    def _state(self):
+        return current_app.extensions["login_throttle"]
+
+    def is_blocked(self, email, ip):
+        state = self._state
+        now = time.monotonic()
+        with state.lock:
+            return (
+                state.count(("account", email), now) >= state.limits["account"]
+                or state.count(("ip", ip), now) >= state.limits["ip"]
+            )
+
+    def reserve(self, email, ip):
+        """Count an attempt for both keys, or return False if either is at its limit."""
+        state = self._state
+        now = time.monotonic()
+        keys = (("account", email), ("ip", ip))
+        with state.lock:
+            counts = [state.count(key, now) for key in keys]
+            if counts[0] >= state.limits["account"] or counts[1] >= state.limits["ip"]:
+                return False
+            for key, count in zip(keys, counts):
+                started = state.entries[key][1] if count else now
+                state.entries[key] = (count + 1, started)
+                state.entries.move_to_end(key)
+            while len(state.entries) > state.max_entries:
+                state.entries.popitem(last=False)
+            return True
+
+    def release(self, email, ip):
+        """Give back an attempt taken by ``reserve`` that didn't turn out to be a failure."""
+        state = self._state
+        now = time.monotonic()
+        with state.lock:
+            for key in (("account", email), ("ip", ip)):
+                count = state.count(key, now)
+                if count > 1:
+                    state.entries[key] = (count - 1, state.entries[key][1])
+                elif count:
+                    del state.entries[key]
+
+    def reset(self, email):
+        state = self._state
+        with state.lock:
+            state.entries.pop(("account", email), None)
@@ -0,0 +1,109 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import create_app, db, password_hasher
+from app.models import User, Workout, Meal, Progress, Goal
+from app.query_budget import QueryCounter, N_PLUS_ONE_THRESHOLD
+
+
+@pytest.fixture
+def app_config():
+    """Config overrides for the test app; override this fixture in a module to change them."""
+    return {}
+
+
+@pytest.fixture
+def make_app(app_config):
+    """Builds apps with the test config; their hashing pools are shut down afterwards."""
+    apps = []
+
+    def make_app():
+        app = create_app({
+            "TESTING": True,
+            "WTF_CSRF_ENABLED": False,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+            **app_config,
+        })
+        apps.append(app)
+        return app
+
+    yield make_app
+    for app in apps:
+        app.extensions["password_hasher"].executor.shutdown()
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user = User(
+            name="Test", email="test@example.com",
+            password=password_hasher.hash("secret123"),
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def client(app, user_id):
+    client = app.test_client()
+    client.post("/login", data={"email": "test@example.com", "password": "secret123"})
+    return client
+
+
+@pytest.fixture
+def query_counter(app):
+    """Counts statements on the app's engine; use as a context manager."""
+    with app.app_context():
+        return QueryCounter(db.engine)
+
+
+def _rows(owner_id, i, today):
+    day = today - timedelta(days=i % 7)
+    return [
+        Workout(user_id=owner_id, date=day, exercise=f"Squat {i}",
+                sets=3, reps=10, duration=30, weight=60.0),
+        Meal(user_id=owner_id, date=day, meal_name=f"Meal {i}",
+             calories=500.0, protein=30.0, carbs=50.0, fats=15.0),
+        Progress(user_id=owner_id, date=day, weight=70.0 + i, notes=""),
+        Goal(user_id=owner_id, target_weight=68.0, focus="loss",
+             deadline=today + timedelta(days=i % 3)),
+    ]
+
+
+@pytest.fixture
+def seed(app, user_id):
+    """
+    Adds ``n`` rows of every user-owned model for the test user, all inside
+    the dashboard windows, plus one of each for ``n`` other users (at least
+    enough to trip N+1 detection). Other owners aren't in the identity map,
+    so touching ``row.user`` in a loop costs a real query per owner.
+    """
+    others = []
+
+    def seed(n):
+        today = date.today()
+        with app.app_context():
+            for i in range(n):
+                db.session.add_all(_rows(user_id, i, today))
+            for _ in range(max(n, N_PLUS_ONE_THRESHOLD)):
+                other = User(name=f"Other {len(others)}",
+                             email=f"other{len(others)}@example.com", password="x")
+                db.session.add(other)
+                db.session.flush()
+                others.append(other.id)
+                db.session.add_all(_rows(other.id, len(others), today))
+            db.session.commit()
+    return seed
@@ -0,0 +1,157 @@
+from datetime import date
+
+import pytest
+from flask import url_for
+
+from app import db
+from app.models import User, Workout
+from werkzeug.security import generate_password_hash
+
+from app.query_budget import get_query_budget
+
+LIST_PAGES = ["main.dashboard", "main.workouts", "main.meals", "main.progress_list", "main.goals"]
+
+TODAY = date.today().isoformat()
+WORKOUT = {"date": TODAY, "exercise": "Squat", "sets": 3, "reps": 5, "duration": 10}
+MEAL = {"date": TODAY, "meal_name": "Oats", "calories": 400}
+PROGRESS = {"date": TODAY, "weight": 70}
+GOAL = {"target_weight": 68, "deadline": TODAY, "focus": "loss"}
+
+# (endpoint, method, path, form data, logged in) -- every route, GET and POST
+ROUTE_CALLS = [
+    ("main.home", "GET", "/", None, True),
+    ("main.register", "GET", "/register", None, False),
+    ("main.register", "POST", "/register",
+     {"name": "New", "email": "new@example.com",
+      "password": "secret123", "confirm_password": "secret123"}, False),
+    ("main.login", "GET", "/login", None, False),
+    ("main.login", "POST", "/login",
+     {"email": "test@example.com", "password": "secret123"}, False),
+    ("main.logout", "GET", "/logout", None, True),
+    ("main.dashboard", "GET", "/dashboard", None, True),
+    ("main.workouts", "GET", "/workouts", None, True),
+    ("main.add_workout", "GET", "/workouts/add", None, True),
+    ("main.add_workout", "POST", "/workouts/add", WORKOUT, True),
+    ("main.edit_workout", "GET", "/workouts/edit/1", None, True),
+    ("main.edit_workout", "POST", "/workouts/edit/1", WORKOUT, True),
+    ("main.delete_workout", "GET", "/workouts/delete/1", None, True),
+    ("main.meals", "GET", "/meals", None, True),
+    ("main.add_meal", "GET", "/meals/add", None, True),
+    ("main.add_meal", "POST", "/meals/add", MEAL, True),
+    ("main.edit_meal", "GET", "/meals/edit/1", None, True),
+    ("main.edit_meal", "POST", "/meals/edit/1", MEAL, True),
+    ("main.delete_meal", "GET", "/meals/delete/1", None, True),
+    ("main.progress_list", "GET", "/progress", None, True),
+    ("main.add_progress", "GET", "/progress/add", None, True),
+    ("main.add_progress", "POST", "/progress/add", PROGRESS, True),
+    ("main.edit_progress", "GET", "/progress/edit/1", None, True),
+    ("main.edit_progress", "POST", "/progress/edit/1", PROGRESS, True),
+    ("main.delete_progress", "GET", "/progress/delete/1", None, True),
+    ("main.goals", "GET", "/goals", None, True),
+    ("main.goals", "POST", "/goals", GOAL, True),
+    ("main.add_goal", "GET", "/goals/add", None, True),
+    ("main.add_goal", "POST", "/goals/add", GOAL, True),
+    ("main.edit_goal", "GET", "/goals/edit/1", None, True),
+    ("main.edit_goal", "POST", "/goals/edit/1", GOAL, True),
+    ("main.delete_goal", "GET", "/goals/delete/1", None, True),
+    ("main.complete_goal", "POST", "/goals/1/complete", None, True),
+]
+
+
+def test_every_route_declares_a_budget(app):
+    missing = [
+        endpoint for endpoint in app.view_functions
+        if endpoint.startswith("main.") and get_query_budget(endpoint, app) is None
+    ]
+    assert missing == []
+
+
+def test_route_calls_cover_every_route(app):
+    called = {call[0] for call in ROUTE_CALLS}
+    assert sorted(e for e in app.view_functions if e.startswith("main.")) == sorted(called)
+
+
+@pytest.mark.parametrize(
+    "endpoint, method, path, data, logged_in", ROUTE_CALLS,
+    ids=[f"{method} {path}" for _, method, path, _, _ in ROUTE_CALLS],
+)
+def test_route_within_budget(app, user_id, query_counter, seed,
+                             endpoint, method, path, data, logged_in):
+    seed(3)
+    client = app.test_client()
+    if logged_in:
+        client.post("/login", data={"email": "test@example.com", "password": "secret123"})
+    with query_counter:
+        response = client.open(path, method=method, data=data)
+    # Successful POSTs and the delete/logout links redirect; a 200 here
+    # would mean the form failed validation and the real path wasn't measured
+    redirects = method == "POST" or "/delete/" in path or path in ("/", "/logout")
+    assert response.status_code == (302 if redirects else 200)
+    query_counter.check(get_query_budget(endpoint, app), label=f"{method} {path}")
+
+
+def test_login_with_rehash_within_budget(app, user_id, query_counter):
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        user.password = generate_password_hash("secret123", method="pbkdf2:sha256:500")
+        db.session.commit()
+    with query_counter:
+        response = app.test_client().post(
+            "/login", data={"email": "test@example.com", "password": "secret123"}
+        )
+    assert response.status_code == 302
+    assert query_counter.count == 3  # lookup, password update, reload after commit
+    query_counter.check(get_query_budget("main.login", app), label="POST /login (rehash)")
+
+
+def _count(app, client, query_counter, endpoint):
+    with app.test_request_context():
+        path = url_for(endpoint)
+    with query_counter:
+        response = client.get(path)
+    assert response.status_code == 200
+    query_counter.check(get_query_budget(endpoint, app), label=endpoint)
+    return query_counter.count
+
+
+@pytest.mark.parametrize("endpoint", LIST_PAGES)
+def test_list_page_queries_do_not_grow_with_data(app, client, query_counter, seed, endpoint):
+    seed(1)
+    small = _count(app, client, query_counter, endpoint)
+    seed(20)
+    large = _count(app, client, query_counter, endpoint)
+    assert large == small, f"{endpoint}: {small} queries with 1 row, {large} with 21"
+
+
+def test_relationship_touched_in_a_loop_fails_the_budget(app, client, query_counter, seed, monkeypatch):
+    # Same as a template doing {{ goal.user.name }} in the reminder loop
+    import app.routes as routes
+    render_template = routes.render_template
+
+    def render_touching_owner(template, **context):
+        for goal in context.get("goals", []):
+            goal.user.name
+        return render_template(template, **context)
+
+    monkeypatch.setattr(routes, "render_template", render_touching_owner)
+    seed(1)
+    with pytest.raises(AssertionError, match="N\\+1"):
+        _count(app, client, query_counter, "main.dashboard")
+
+
+def test_counter_flags_lazy_loads_in_a_loop(app, query_counter):
+    with app.app_context():
+        for i in range(3):
+            owner = User(name=f"User {i}", email=f"user{i}@example.com", password="x")
+            owner.workouts.append(
+                Workout(date=date.today(), exercise="Row", sets=3, reps=10, duration=20)
+            )
+            db.session.add(owner)
+        db.session.commit()
+
+    with app.app_context(), query_counter:
+        for workout in Workout.query.all():
+            workout.user.name
+    assert len(query_counter.repeated()) == 1
+    with pytest.raises(AssertionError, match="N\\+1"):
+        query_counter.check(None)
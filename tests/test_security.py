@@ -0,0 +1,187 @@
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db, password_hasher, login_throttle
+from app.models import User
+import app.security as security
+
+
+@pytest.fixture
+def app_config():
+    return {
+        "LOGIN_MAX_ATTEMPTS_ACCOUNT": 3,
+        "LOGIN_MAX_ATTEMPTS_IP": 5,
+        "LOGIN_THROTTLE_ENTRIES": 4,
+    }
+
+
+@pytest.fixture
+def hash_calls(monkeypatch):
+    """Counts password checks that reach the hashing pool."""
+    calls = []
+    check = security.check_password_hash
+
+    def counting_check(pwhash, password):
+        calls.append(pwhash)
+        return check(pwhash, password)
+
+    monkeypatch.setattr(security, "check_password_hash", counting_check)
+    return calls
+
+
+def login(client, password, email="test@example.com", ip="10.0.0.1"):
+    return client.post(
+        "/login",
+        data={"email": email, "password": password},
+        environ_base={"REMOTE_ADDR": ip},
+    )
+
+
+def test_account_throttled_before_hashing(app, user_id, hash_calls):
+    client = app.test_client()
+    for _ in range(3):
+        assert login(client, "wrong").status_code == 200
+    assert len(hash_calls) == 3
+
+    assert login(client, "secret123").status_code == 429
+    assert len(hash_calls) == 3
+
+
+def test_concurrent_guesses_stay_within_limit(app, user_id, monkeypatch):
+    calls = []
+    check = security.check_password_hash
+    start = threading.Barrier(10)
+
+    def slow_check(pwhash, password):
+        calls.append(pwhash)
+        time.sleep(0.05)
+        return check(pwhash, password)
+
+    monkeypatch.setattr(security, "check_password_hash", slow_check)
+
+    def guess(i):
+        client = app.test_client()
+        start.wait()
+        statuses.append(login(client, "wrong", ip=f"10.1.0.{i}").status_code)
+
+    statuses = []
+    threads = [threading.Thread(target=guess, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 3
+    assert sorted(statuses) == [200] * 3 + [429] * 7
+
+
+def test_rejected_when_busy_does_not_count(app, user_id):
+    slots = app.extensions["password_hasher"].slots
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    try:
+        for _ in range(4):
+            assert login(app.test_client(), "wrong").status_code == 503
+    finally:
+        for _ in range(taken):
+            slots.release()
+    assert login(app.test_client(), "secret123").status_code == 302
+
+
+def test_ip_throttled_across_accounts(app, user_id):
+    client = app.test_client()
+    for i in range(5):
+        login(client, "wrong", email=f"nobody{i}@example.com")
+    assert login(client, "secret123").status_code == 429
+    assert login(client, "secret123", ip="10.0.0.2").status_code == 302
+
+
+def test_success_resets_account_counter(app, user_id):
+    client = app.test_client()
+    for _ in range(2):
+        login(client, "wrong")
+    assert login(client, "secret123").status_code == 302
+    client.get("/logout")
+    for _ in range(2):
+        assert login(client, "wrong").status_code == 200
+    assert login(client, "secret123").status_code == 302
+
+
+def test_window_expiry(app, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(security.time, "monotonic", lambda: now[0])
+    with app.app_context():
+        for _ in range(3):
+            login_throttle.reserve("a@example.com", "10.0.0.1")
+        assert login_throttle.is_blocked("a@example.com", "10.0.0.9")
+        now[0] += app.config["LOGIN_THROTTLE_WINDOW"]
+        assert not login_throttle.is_blocked("a@example.com", "10.0.0.9")
+
+
+def test_max_entries_evicts_oldest(app):
+    with app.app_context():
+        for _ in range(3):
+            login_throttle.reserve("a@example.com", "10.0.0.1")
+        for _ in range(3):
+            login_throttle.reserve("b@example.com", "10.0.0.2")
+        assert login_throttle.is_blocked("b@example.com", "10.0.0.9")
+        # Two more keys push out a@example.com and 10.0.0.1
+        login_throttle.reserve("c@example.com", "10.0.0.3")
+        assert not login_throttle.is_blocked("a@example.com", "10.0.0.9")
+        assert login_throttle.is_blocked("b@example.com", "10.0.0.9")
+
+
+def test_throttle_state_is_per_app(app, make_app):
+    with app.app_context():
+        for _ in range(3):
+            login_throttle.reserve("a@example.com", "10.0.0.1")
+        assert login_throttle.is_blocked("a@example.com", "10.0.0.1")
+    other = make_app()
+    with other.app_context():
+        assert not login_throttle.is_blocked("a@example.com", "10.0.0.1")
+
+
+def test_old_hash_upgraded_after_login(app, user_id):
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        user.password = generate_password_hash(
+            "secret123", method="pbkdf2:sha256:500", salt_length=8
+        )
+        db.session.commit()
+
+    assert login(app.test_client(), "secret123").status_code == 302
+    with app.app_context():
+        stored = db.session.get(User, user_id).password
+        assert stored.startswith("pbkdf2:sha256:1000$")
+        assert not password_hasher.needs_rehash(stored)
+
+
+def test_stronger_hash_is_kept(app):
+    with app.app_context():
+        stronger = generate_password_hash(
+            "secret123", method="pbkdf2:sha256:2000", salt_length=16
+        )
+        assert not password_hasher.needs_rehash(stronger)
+        shorter_salt = generate_password_hash(
+            "secret123", method="pbkdf2:sha256:2000", salt_length=8
+        )
+        assert password_hasher.needs_rehash(shorter_salt)
+        assert password_hasher.needs_rehash(generate_password_hash("x", method="scrypt"))
+
+
+def test_full_pool_returns_503(app, user_id, hash_calls):
+    slots = app.extensions["password_hasher"].slots
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    try:
+        assert login(app.test_client(), "secret123").status_code == 503
+        assert hash_calls == []
+    finally:
+        for _ in range(taken):
+            slots.release()
+    assert login(app.test_client(), "secret123").status_code == 302